@@ -0,0 +1 @@
+"""Headless batch conversion, to be run inside a background Blender session"""
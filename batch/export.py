@@ -0,0 +1,263 @@
+"""Exports generated rigs as lean, deform-only skeletons for game engines"""
+
+import bpy
+
+from ..shared import make_single_active
+
+DEFORM_PREFIX = "DEF-"
+# Rigify copies every metarig bone as ORG-<name>, which the DEF bones follow
+ORIGINAL_PREFIX = "ORG-"
+__FOLLOW_CONSTRAINT__ = "FBX2Rigify Follow Metarig"
+# below this, a baked value counts as constant
+__EPSILON__ = 1e-5
+EXPORT_FORMATS = {
+    ".fbx": "FBX",
+    ".glb": "GLB",
+    ".gltf": "GLTF_SEPARATE",
+}
+
+# (data path, number of channels) keyed on the deform skeleton
+__CHANNELS__ = (
+    ("location", 3),
+    ("rotation_quaternion", 4),
+    ("scale", 3),
+)
+
+
+def find_deform_parent(bone, prefix=DEFORM_PREFIX):
+    """Returns the closest ancestor of `bone` which is also a deform bone"""
+    parent = bone.parent
+    while parent and not parent.name.startswith(prefix):
+        parent = parent.parent
+    return parent
+
+
+def extract_deform_skeleton(rig, prefix=DEFORM_PREFIX):
+    """
+        Creates a new armature with only the deform bones of the given rig,
+        re-parented onto their closest deform ancestors.
+        Returns:
+            the new armature object, or None if the rig has no deform bones
+    """
+    names = [bone.name for bone in rig.data.bones if bone.name.startswith(prefix)]
+    if not names:
+        return None
+
+    data = bpy.data.armatures.new(rig.data.name + "_deform")
+    skeleton = bpy.data.objects.new(rig.name + "_deform", data)
+    skeleton.matrix_world = rig.matrix_world.copy()
+    bpy.context.scene.collection.objects.link(skeleton)
+
+    make_single_active(skeleton)
+    bpy.ops.object.mode_set(mode="EDIT")
+
+    edit_bones = data.edit_bones
+    for name in names:
+        src = rig.data.bones[name]
+        edit_bone = edit_bones.new(name)
+        # NOTE: head and tail MUST be set, `matrix` then restores the roll
+        edit_bone.head = src.head_local
+        edit_bone.tail = src.tail_local
+        edit_bone.matrix = src.matrix_local
+        edit_bone.use_deform = True
+
+    for name in names:
+        parent = find_deform_parent(rig.data.bones[name], prefix)
+        if parent:
+            edit_bones[name].parent = edit_bones[parent.name]
+
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    for pose_bone in skeleton.pose.bones:
+        pose_bone.rotation_mode = "QUATERNION"
+
+    return skeleton
+
+
+def get_frame_range(*objects):
+    """Returns the union of the frame ranges of the objects' actions, or None without any"""
+    ranges = [obj.animation_data.action.frame_range for obj in objects
+              if obj and obj.animation_data and obj.animation_data.action]
+    if not ranges:
+        return None
+
+    return (int(min(r[0] for r in ranges)), int(max(r[1] for r in ranges)))
+
+
+def follow_metarig(rig, metarig):
+    """
+        Makes the rig's ORG bones copy the (animated) metarig bones they were generated
+        from, since the imported animation stays on the metarig.
+        Returns:
+            the added constraints, to be removed with `unfollow_metarig`
+    """
+    constraints = []
+    for bone in metarig.pose.bones:
+        org_bone = rig.pose.bones.get(ORIGINAL_PREFIX + bone.name)
+        if not org_bone:
+            continue
+
+        constraint = org_bone.constraints.new("COPY_TRANSFORMS")
+        constraint.name = __FOLLOW_CONSTRAINT__
+        constraint.target = metarig
+        constraint.subtarget = bone.name
+        constraints.append((org_bone, constraint))
+
+    return constraints
+
+
+def unfollow_metarig(constraints):
+    for pose_bone, constraint in constraints:
+        pose_bone.constraints.remove(constraint)
+
+
+def count_animated_bones(samples):
+    """Returns how many bones have at least one channel changing over the frames"""
+    count = 0
+    for channel in samples.values():
+        if not channel:
+            continue
+
+        first = channel[0]
+        if any(abs(a - b) > __EPSILON__
+               for sample in channel[1:]
+               for values, ref in zip(sample, first)
+               for a, b in zip(values, ref)):
+            count += 1
+    return count
+
+
+def sample_deform_pose(rig, skeleton, frames):
+    """
+        Evaluates the rig at every frame and converts its deform bones' poses
+        into the local (basis) space of the skeleton's bones.
+        Returns:
+            {bone name: [(location, quaternion, scale), ...]}, one entry per frame
+    """
+    bones = skeleton.data.bones
+    # rest pose of each bone relative to its parent, constant over frames
+    rest_offsets = {
+        bone.name: (bone.parent.matrix_local.inverted() @ bone.matrix_local
+                    if bone.parent else bone.matrix_local).inverted()
+        for bone in bones
+    }
+
+    samples = {bone.name: [] for bone in bones}
+    scene = bpy.context.scene
+
+    for frame in frames:
+        scene.frame_set(frame)
+        pose_bones = rig.pose.bones
+
+        for bone in bones:
+            pose = pose_bones[bone.name].matrix
+            if bone.parent:
+                pose = pose_bones[bone.parent.name].matrix.inverted() @ pose
+
+            loc, quat, scale = (rest_offsets[bone.name] @ pose).decompose()
+
+            channel = samples[bone.name]
+            if channel:
+                # avoids flips in the interpolation
+                quat.make_compatible(channel[-1][1])
+            channel.append((loc, quat, scale))
+
+    return samples
+
+
+def write_keys(skeleton, frames, samples):
+    """Writes all sampled keys into a new action, one bulk insertion per F-Curve"""
+    action = bpy.data.actions.new(skeleton.name + "_action")
+    skeleton.animation_data_create()
+    skeleton.animation_data.action = action
+
+    for name, channel in samples.items():
+        for index, (data_path, size) in enumerate(__CHANNELS__):
+            full_path = f'pose.bones["{name}"].{data_path}'
+
+            for axis in range(size):
+                fcurve = action.fcurves.new(full_path, index=axis, action_group=name)
+                fcurve.keyframe_points.add(len(frames))
+
+                co = []
+                for frame, sample in zip(frames, channel):
+                    co.extend((frame, sample[index][axis]))
+
+                fcurve.keyframe_points.foreach_set("co", co)
+                fcurve.update()
+
+    return action
+
+
+def bake_deform_animation(rig, skeleton, metarig=None, frame_range=None):
+    """
+        Bakes the rig's deform bone animation onto the lean skeleton, driving
+        the rig from the metarig's animation if given.
+        Returns:
+            the number of bones whose baked animation isn't constant
+    """
+    frame_range = frame_range or get_frame_range(rig, metarig)
+    # nothing to bake: the skeleton gets exported in its rest pose
+    if not frame_range:
+        return 0
+
+    start, end = frame_range
+    frames = list(range(int(start), int(end) + 1))
+    if not frames:
+        return 0
+
+    constraints = follow_metarig(rig, metarig) if metarig else []
+    current = bpy.context.scene.frame_current
+    try:
+        samples = sample_deform_pose(rig, skeleton, frames)
+    finally:
+        bpy.context.scene.frame_set(current)
+        unfollow_metarig(constraints)
+
+    write_keys(skeleton, frames, samples)
+    return count_animated_bones(samples)
+
+
+def export_skeleton(skeleton, filepath):
+    """Writes the skeleton as FBX or glTF, picked from the file extension"""
+    ext = filepath[filepath.rfind("."):].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {ext}")
+
+    make_single_active(skeleton)
+    # NOTE: otherwise the FBX exporter samples the scene range of a static skeleton
+    animated = bool(skeleton.animation_data and skeleton.animation_data.action)
+
+    if ext == ".fbx":
+        bpy.ops.export_scene.fbx(
+            filepath=filepath,
+            use_selection=True,
+            object_types={"ARMATURE"},
+            add_leaf_bones=False,
+            bake_anim=animated,
+            bake_anim_use_nla_strips=False,
+            bake_anim_use_all_actions=False,
+        )
+    else:
+        bpy.ops.export_scene.gltf(
+            filepath=filepath,
+            export_format=EXPORT_FORMATS[ext],
+            use_selection=True,
+            export_animations=animated,
+        )
+
+
+def export_deform_rig(rig, filepath, metarig=None, frame_range=None):
+    """
+        Extracts, bakes and exports the deform-only skeleton of a generated rig,
+        animated from its metarig if given.
+        Returns:
+            the number of animated deform bones, or None if the rig has none
+    """
+    skeleton = extract_deform_skeleton(rig)
+    if not skeleton:
+        return None
+
+    animated = bake_deform_animation(rig, skeleton, metarig, frame_range)
+    export_skeleton(skeleton, filepath)
+    return animated
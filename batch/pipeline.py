@@ -0,0 +1,86 @@
+"""The per-file conversion steps, free of any UI context"""
+
+import os
+import time
+
+import bpy
+
+from . import export
+from .. import rig_spec
+from ..shared import apply_transforms, make_single_active
+
+
+def import_fbx(filepath: str):
+    """
+        Imports the FBX file into the current scene.
+        Returns:
+            the first imported armature, or None if the file has no skeleton
+    """
+    bpy.ops.import_scene.fbx(filepath=filepath)
+    armatures = [obj for obj in bpy.context.selected_objects
+                 if obj.type == "ARMATURE"]
+    return armatures[0] if armatures else None
+
+
+def apply_and_generate(metarig):
+    """
+        Same as the `ApplyAndGenerate` operator, on the given metarig.
+        Returns:
+            the generated rig, or None if no bone has been assigned some metarig
+    """
+    # nothing for Rigify to generate
+    if not any(bone.rigify_type for bone in metarig.pose.bones):
+        return None
+
+    make_single_active(metarig)
+    apply_transforms(metarig)
+    bpy.ops.pose.rigify_generate()
+
+    # Rigify leaves the generated rig as the active object
+    return bpy.context.view_layer.objects.active
+
+
+def convert_file(src: str, dst: str, spec: str = None) -> dict:
+    """
+        Imports `src`, generates the rig and saves the result as `dst`.
+        A .blend `dst` keeps the whole scene, while a .fbx/.glb/.gltf one only
+        gets the deform skeleton of the generated rig, baked for game engines.
+        If given, the rig-spec at `spec` is replayed onto the armature first.
+        Returns:
+            a dict of metrics about the conversion
+    """
+    start = time.perf_counter()
+    result = {"src": src, "dst": dst, "ok": False}
+
+    metarig = import_fbx(src)
+    if not metarig:
+        result["error"] = "No armature found"
+        return result
+
+    if spec:
+        rig_spec.apply(metarig, rig_spec.load(spec))
+
+    rig = apply_and_generate(metarig)
+    result["generated"] = rig is not None
+
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+
+    if os.path.splitext(dst)[1].lower() in export.EXPORT_FORMATS:
+        if not rig:
+            result["error"] = "No rig generated to export"
+            return result
+
+        animated = export.export_deform_rig(rig, dst, metarig)
+        if animated is None:
+            result["error"] = "No deform bones to export"
+            return result
+
+        result["animated_bones"] = animated
+        if not animated and metarig.animation_data and metarig.animation_data.action:
+            print(f"WARNING: {src} is animated but no deform bone moves in {dst}")
+    else:
+        bpy.ops.wm.save_as_mainfile(filepath=dst, copy=True)
+
+    result["ok"] = True
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
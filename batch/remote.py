@@ -0,0 +1,150 @@
+"""
+A conversion worker pulling its jobs from the job server over HTTP.
+
+It keeps one Blender session warm the same way as `worker`, and pushes each
+result back with its metrics. It exits once the server has no job left, or with
+`worker.RECYCLE_EXIT_CODE` past the memory high-water mark.
+
+Usage:
+    blender -b --addons rigify,FBX2Rigify --python-expr \
+        "from FBX2Rigify.batch import remote; remote.main()" -- --server http://host:8765
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from . import worker
+
+DEFAULT_SERVER = "http://127.0.0.1:8765"
+POLL_SECONDS = 2.0
+# renews the job's lease that many times per lease period
+RENEWALS_PER_LEASE = 3
+# waits 1, 2, 4, 8 then 16 seconds before giving up on the server
+RETRIES = 5
+
+
+def post(server: str, route: str, payload: dict) -> dict:
+    request = urllib.request.Request(
+        server.rstrip("/") + route,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def post_with_retry(server: str, route: str, payload: dict) -> dict:
+    """
+        Same as `post`, retrying with a backoff on network errors.
+        Raises:
+            OSError once the server has been unreachable for all retries,
+            or right away if it rejected the request
+    """
+    for attempt in range(RETRIES + 1):
+        try:
+            return post(server, route, payload)
+        except urllib.error.HTTPError as e:
+            # the server answered, asking again won't change its mind
+            if e.code < 500 or attempt == RETRIES:
+                raise
+        except OSError:
+            if attempt == RETRIES:
+                raise
+
+        time.sleep(2 ** attempt)
+
+
+def keep_lease(server: str, name: str, job_id, interval: float, stop: threading.Event):
+    """Renews the lease of the job every `interval` seconds, until `stop` is set"""
+    while not stop.wait(interval):
+        try:
+            if not post(server, "/renew", {"id": job_id, "worker": name}).get("ok"):
+                print(f"Lease on job {job_id} was lost, another worker may run it")
+        except OSError as e:
+            print(f"Could not renew the lease on job {job_id}: {e}")
+
+
+def run_leased_job(server: str, name: str, job: dict, lease_seconds: float,
+                   baseline: dict) -> dict:
+    """Runs the job while renewing its lease, so that a long conversion isn't handed out twice"""
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=keep_lease,
+        args=(server, name, job["id"], lease_seconds / RENEWALS_PER_LEASE, stop),
+        daemon=True)
+    heartbeat.start()
+
+    try:
+        return worker.run_job(job, baseline)
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def pull(server: str, name: str, max_rss_mb=worker.DEFAULT_MAX_RSS_MB):
+    """
+        Claims and runs jobs until the server is done, or the memory goes too high.
+        Returns:
+            the exit code for the worker process
+    """
+    # the state to come back to before each job
+    baseline = worker.snapshot_session()
+
+    while True:
+        try:
+            reply = post_with_retry(server, "/claim", {"worker": name})
+        except OSError as e:
+            # e.g. the server shut down once all jobs were done
+            print(f"Job server {server} is gone ({e}), exiting")
+            return 0
+
+        job = reply.get("job")
+
+        if job is None:
+            if reply.get("done"):
+                return 0
+            # other workers still hold jobs which may come back on failure
+            time.sleep(POLL_SECONDS)
+            continue
+
+        result = run_leased_job(server, name, job, reply["lease_seconds"], baseline)
+        result["id"] = job["id"]
+        result["worker"] = name
+        result["recycle"] = bool(max_rss_mb) and result["rss_mb"] > max_rss_mb
+        try:
+            post_with_retry(server, "/result", result)
+        except urllib.error.HTTPError as e:
+            # e.g. a job of a previous server run
+            print(f"Job server rejected the result of job {job['id']}: {e}")
+        except OSError as e:
+            print(f"Job server {server} is gone ({e}), exiting")
+            return 0
+
+        if result["recycle"]:
+            print(f"Worker RSS {result['rss_mb']} MB is past {max_rss_mb} MB, recycling")
+            return worker.RECYCLE_EXIT_CODE
+
+
+def parse_args(argv):
+    # Blender's own arguments come before "--"
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+
+    parser = argparse.ArgumentParser(prog="FBX2Rigify remote worker")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parser.add_argument("--name", default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument("--max-rss-mb", type=float, default=worker.DEFAULT_MAX_RSS_MB,
+                        help="recycle the worker past this resident memory, 0 to disable")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv)
+    sys.exit(pull(args.server, args.name, max_rss_mb=args.max_rss_mb))
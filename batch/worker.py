@@ -0,0 +1,228 @@
+"""
+A long-lived conversion worker, which keeps one Blender session alive across jobs.
+
+Jobs are read from stdin as JSON lines: {"src": "in.fbx", "dst": "out.blend"},
+with an optional "spec" path to a rig-spec to replay before generating.
+For each job, one result line is written to stdout, prefixed with `RESULT_PREFIX`
+so that it can be told apart from Blender's own output.
+
+Between jobs the scene is cleared and orphan data-blocks are purged, instead of
+relaunching Blender. Once the resident memory goes past the high-water mark, the
+worker exits with `RECYCLE_EXIT_CODE` so the driver can start a fresh session.
+
+Usage:
+    blender -b --addons rigify,FBX2Rigify --python-expr \
+        "from FBX2Rigify.batch import worker; worker.main()" -- --max-rss-mb 4096
+"""
+
+import argparse
+import json
+import os
+import sys
+import traceback
+
+import bpy
+
+from . import pipeline
+
+RESULT_PREFIX = "FBX2RIGIFY_RESULT "
+# tells the driver to relaunch the worker, see `scripts/batch_convert.py`
+RECYCLE_EXIT_CODE = 75
+# 0 means never recycle
+DEFAULT_MAX_RSS_MB = 4096
+
+# scene settings that jobs (e.g. the FBX import) may change
+__SCENE_SETTINGS__ = ("frame_start", "frame_end", "frame_current", "frame_step")
+__RENDER_SETTINGS__ = ("fps", "fps_base")
+
+
+def clear_scene():
+    """Removes all objects and collections, leaving their data as orphans"""
+    if bpy.context.object and bpy.context.object.mode != "OBJECT":
+        bpy.ops.object.mode_set(mode="OBJECT")
+
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+
+    for coll in list(bpy.data.collections):
+        bpy.data.collections.remove(coll)
+
+
+def iter_registered_classes():
+    """Yields all the UI and operator classes currently registered to Blender"""
+    for base in (bpy.types.Panel, bpy.types.Operator, bpy.types.Menu,
+                 bpy.types.UIList, bpy.types.PropertyGroup):
+        stack = list(base.__subclasses__())
+        while stack:
+            cls = stack.pop()
+            stack.extend(cls.__subclasses__())
+            if getattr(cls, "is_registered", False):
+                yield cls
+
+
+def snapshot_session() -> dict:
+    """Records the session state that jobs leave behind, to be restored later"""
+    scene = bpy.context.scene
+    return {
+        "scene": {name: getattr(scene, name) for name in __SCENE_SETTINGS__},
+        "render": {name: getattr(scene.render, name) for name in __RENDER_SETTINGS__},
+        "texts": {text.name for text in bpy.data.texts},
+        "classes": set(iter_registered_classes()),
+    }
+
+
+def restore_session(baseline: dict):
+    """
+        Undoes what a job left outside of the scene's data: the scene settings,
+        and the `rig_ui.py` scripts Rigify runs for each generated rig, along
+        with the classes they registered.
+    """
+    scene = bpy.context.scene
+    for name, value in baseline["scene"].items():
+        setattr(scene, name, value)
+    for name, value in baseline["render"].items():
+        setattr(scene.render, name, value)
+
+    for text in list(bpy.data.texts):
+        if text.name not in baseline["texts"]:
+            bpy.data.texts.remove(text)
+
+    added = [cls for cls in iter_registered_classes()
+             if cls not in baseline["classes"]]
+    # NOTE: sub-panels must go before their parents
+    added.sort(key=lambda cls: not getattr(cls, "bl_parent_id", ""))
+    for cls in added:
+        try:
+            bpy.utils.unregister_class(cls)
+        except RuntimeError:
+            print(f"Could not unregister {cls.__name__}")
+
+
+def purge_orphans():
+    """
+        Removes all data-blocks without users.
+        Returns:
+            the number of removed data-blocks
+    """
+    # Blender 3.0+ can purge recursively in one call
+    if hasattr(bpy.data, "orphans_purge"):
+        return bpy.data.orphans_purge(
+            do_local_ids=True, do_linked_ids=True, do_recursive=True)
+
+    # otherwise, keeps purging until nothing is left since removing a
+    # data-block may orphan the ones it used
+    removed = 0
+    while True:
+        orphans = [id_data for collection in (
+            bpy.data.actions,
+            bpy.data.armatures,
+            bpy.data.meshes,
+            bpy.data.materials,
+            bpy.data.images,
+            bpy.data.textures,
+            bpy.data.node_groups,
+        ) for id_data in collection if id_data.users == 0]
+
+        if not orphans:
+            return removed
+
+        bpy.data.batch_remove(orphans)
+        removed += len(orphans)
+
+
+def reset_scene(baseline: dict):
+    """Brings the session back to an empty scene and the `baseline` state, ready for the next job"""
+    clear_scene()
+    restore_session(baseline)
+    return purge_orphans()
+
+
+def current_rss_mb():
+    """Returns the resident memory of this process in MB"""
+    # Linux: current RSS
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # elsewhere: falls back to the peak RSS
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # NOTE: kilobytes on Linux, but bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return peak / divisor
+
+
+def run_job(job: dict, baseline: dict) -> dict:
+    """
+        Runs a single job on a clean scene, never raising.
+        NOTE: the job's data stays around until the next job resets the scene,
+        rather than clearing it twice between jobs.
+    """
+    try:
+        reset_scene(baseline)
+        result = pipeline.convert_file(job["src"], job["dst"], job.get("spec"))
+    except Exception:
+        result = {"src": job.get("src"), "dst": job.get("dst"),
+                  "ok": False, "error": traceback.format_exc()}
+
+    result["rss_mb"] = round(current_rss_mb(), 1)
+    return result
+
+
+def serve(stream_in, stream_out, max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """
+        Processes jobs from `stream_in` until EOF or the memory high-water mark.
+        Returns:
+            the exit code for the worker process
+    """
+    # the state to come back to before each job
+    baseline = snapshot_session()
+
+    for line in stream_in:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("a job must be a JSON object")
+        except ValueError as e:
+            # reports the bad line rather than taking the whole worker down
+            result = {"ok": False, "error": f"Malformed job {line!r}: {e}",
+                      "rss_mb": round(current_rss_mb(), 1)}
+        else:
+            result = run_job(job, baseline)
+
+        result["recycle"] = bool(max_rss_mb) and result["rss_mb"] > max_rss_mb
+
+        stream_out.write(RESULT_PREFIX + json.dumps(result) + "\n")
+        stream_out.flush()
+
+        if result["recycle"]:
+            print(f"Worker RSS {result['rss_mb']} MB is past {max_rss_mb} MB, recycling")
+            return RECYCLE_EXIT_CODE
+
+    return 0
+
+
+def parse_args(argv):
+    # Blender's own arguments come before "--"
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+
+    parser = argparse.ArgumentParser(prog="FBX2Rigify worker")
+    parser.add_argument("--max-rss-mb", type=float, default=DEFAULT_MAX_RSS_MB,
+                        help="recycle the worker past this resident memory, 0 to disable")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv)
+    sys.exit(serve(sys.stdin, sys.stdout, max_rss_mb=args.max_rss_mb))
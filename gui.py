@@ -1,6 +1,8 @@
 import bpy
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 
-from . import user_fields
+from . import rig_spec, user_fields
+from .shared import apply_transforms
 
 
 class FBX2RigifyPanel(bpy.types.Panel):
@@ -54,6 +56,13 @@ class FBX2RigifyPanel(bpy.types.Panel):
                 row.operator(ApplyAndGenerate.bl_idname,
                              text="Apply Xforms & Generate Rig", icon="HEART")
 
+            layout.separator()
+            row = layout.row()
+            row.label(text="Rig Spec:")
+            row = layout.row()
+            row.operator(SaveRigSpec.bl_idname, text="Save", icon="EXPORT")
+            row.operator(ApplyRigSpec.bl_idname, text="Apply", icon="IMPORT")
+
 
 class ApplyAndGenerate(bpy.types.Operator):
     """Applies all transforms and generates Rigify"""
@@ -62,8 +71,52 @@ class ApplyAndGenerate(bpy.types.Operator):
     bl_label = "Apply all transforms and generate Rigify"
 
     def execute(self, context):
-        bpy.ops.object.transform_apply(
-            location=True, rotation=True, scale=True)
+        apply_transforms(context.active_object)
         bpy.ops.pose.rigify_generate()
 
         return {"FINISHED"}
+
+
+class SaveRigSpec(bpy.types.Operator, ExportHelper):
+    """Saves the conversion edits of the selected armature as a rig-spec"""
+
+    bl_idname = "fbx2rigify.save_rig_spec"
+    bl_label = "Save Rig Spec"
+
+    filename_ext = ".json"
+    # lets ".json.gz" through too
+    check_extension = None
+
+    filter_glob: bpy.props.StringProperty(default="*.json;*.gz", options={"HIDDEN"})
+
+    def execute(self, context):
+        armatures = [obj for obj in context.selected_objects
+                     if obj.type == "ARMATURE"]
+        if not armatures:
+            return {"CANCELLED"}
+
+        rig_spec.save(rig_spec.capture(armatures[0]), self.filepath)
+        return {"FINISHED"}
+
+
+class ApplyRigSpec(bpy.types.Operator, ImportHelper):
+    """Replays a rig-spec onto the selected armature"""
+
+    bl_idname = "fbx2rigify.apply_rig_spec"
+    bl_label = "Apply Rig Spec"
+
+    filter_glob: bpy.props.StringProperty(default="*.json;*.gz", options={"HIDDEN"})
+
+    def execute(self, context):
+        armatures = [obj for obj in context.selected_objects
+                     if obj.type == "ARMATURE"]
+        if not armatures:
+            return {"CANCELLED"}
+
+        try:
+            rig_spec.apply(armatures[0], rig_spec.load(self.filepath))
+        except ValueError as e:
+            self.report({"ERROR"}, str(e))
+            return {"CANCELLED"}
+
+        return {"FINISHED"}
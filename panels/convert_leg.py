@@ -4,6 +4,9 @@ import mathutils
 
 # prop name tagged to initialized object in order to display immediate-mode-style UI
 __IS_WORKING_ITEM__ = "fbx2rigify_leg"
+# prop name tagged to bones created here, see `rig_spec`
+__IS_ADDED_BONE__ = "fbx2rigify_added"
+__HEEL_BONE_NAME__ = "Heel"
 # we need: 1 thigh, 1 shin, 1 foot, 1 toe, 1 heel
 __REQUIRED_BONE_NUM__ = 5
 
@@ -177,7 +180,8 @@ class HeelPrep(bpy.types.Operator):
 
         # Create the heel bone
         armature = obj.data
-        heel_bone = armature.edit_bones.new("Heel")
+        heel_bone = armature.edit_bones.new(__HEEL_BONE_NAME__)
+        heel_bone[__IS_ADDED_BONE__] = True
         # NOTE: After creation, the bone's head and tail position MUST be set
 
         # In case user has selected "some" foot bone
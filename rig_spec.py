@@ -0,0 +1,205 @@
+"""
+Serialized rig-spec: the edits the conversion operators made to an armature,
+to replay onto same-skeleton armatures without the UI.
+
+Only the edits are stored, so that the imported bones of the target keep their
+own proportions. Bones are stored by index, with one flat array per attribute:
+    {
+        "version": 1,
+        "bones": [name, ...],        # index -> name
+        "base": int,                 # the first `base` bones must exist in the target,
+                                     # the others (e.g. Heel) are created on apply
+        "connect": [index, ...],     # connected bones, their parent's tail is snapped
+                                     # to their head (see `SnapParentTail`)
+        "added_parent": [index or -1, ...],  # one entry per created bone
+        "added_matrix": [16 floats, ...],    # rest matrix relative to the parent,
+                                             # translation in parent lengths
+        "added_length": [...],               # in parent lengths
+        "rigify_type": {"index": [...], "value": [...]},   # sparse
+        "tags": [prop name, ...],    # object custom properties set to True
+    }
+A path ending with `.gz` is gzipped.
+"""
+
+import gzip
+import json
+import re
+
+import bpy
+import mathutils
+
+from .panels.convert_leg import (__HEEL_BONE_NAME__, __IS_ADDED_BONE__,
+                                 __IS_WORKING_ITEM__)
+from .shared import make_single_active, preserved_selection
+
+SPEC_VERSION = 1
+# object custom props carried over by the spec
+__SPEC_TAGS__ = (__IS_WORKING_ITEM__,)
+# also matches the ".001" suffixes Blender adds to duplicate names
+__HEEL_PATTERN__ = re.compile(re.escape(__HEEL_BONE_NAME__) + r"(\.\d{3})?")
+# the metarig `AssignLeg` tags the thigh with, the Heel hanging below its foot
+__LEG_RIGIFY_TYPE__ = "limbs.leg"
+
+
+def is_added_bone(bone, pose_bones) -> bool:
+    """Tells whether the edit bone was created by the operators, rather than imported"""
+    if __IS_ADDED_BONE__ in bone:
+        return True
+
+    # NOTE: Heel bones created before the tag existed only have their name to go by,
+    # so only those placed under a tagged leg count, not some imported "Heel"
+    if not __HEEL_PATTERN__.fullmatch(bone.name):
+        return False
+
+    parent = bone.parent
+    while parent:
+        # NOTE: bones created in this EDIT session have no pose bone yet
+        pose_bone = pose_bones.get(parent.name)
+        if pose_bone and pose_bone.rigify_type == __LEG_RIGIFY_TYPE__:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _depth(bone) -> int:
+    depth = 0
+    while bone.parent:
+        bone = bone.parent
+        depth += 1
+    return depth
+
+
+def _relative_matrix(bone):
+    """Returns the bone's rest matrix relative to its parent's, and its relative length"""
+    if not bone.parent:
+        return bone.matrix.copy(), bone.length
+
+    parent = bone.parent
+    matrix = parent.matrix.inverted() @ bone.matrix
+    matrix.translation /= parent.length
+    return matrix, bone.length / parent.length
+
+
+def capture(obj) -> dict:
+    """Captures the rig-spec of the given armature object"""
+    with preserved_selection():
+        make_single_active(obj)
+        bpy.ops.object.mode_set(mode="EDIT")
+
+        edit_bones = obj.data.edit_bones
+        pose_bones = obj.pose.bones
+        base = [b for b in edit_bones if not is_added_bone(b, pose_bones)]
+        # parents first, so that they exist by the time their children are created
+        added = sorted((b for b in edit_bones if is_added_bone(b, pose_bones)), key=_depth)
+        names = [b.name for b in base + added]
+        index = {name: i for i, name in enumerate(names)}
+
+        spec = {
+            "version": SPEC_VERSION,
+            "bones": names,
+            "base": len(base),
+            "connect": [index[b.name] for b in base + added if b.use_connect],
+            "added_parent": [],
+            "added_matrix": [],
+            "added_length": [],
+        }
+
+        for bone in added:
+            matrix, length = _relative_matrix(bone)
+            spec["added_parent"].append(index[bone.parent.name] if bone.parent else -1)
+            spec["added_matrix"].extend(value for row in matrix for value in row)
+            spec["added_length"].append(length)
+
+        bpy.ops.object.mode_set(mode="OBJECT")
+
+        typed = [i for i, name in enumerate(names) if pose_bones[name].rigify_type]
+        spec["rigify_type"] = {
+            "index": typed,
+            "value": [pose_bones[names[i]].rigify_type for i in typed],
+        }
+        spec["tags"] = [tag for tag in __SPEC_TAGS__ if tag in obj]
+
+    return spec
+
+
+def apply(obj, spec: dict):
+    """
+        Replays the rig-spec's edits onto the given armature object in one pass.
+        Raises:
+            ValueError if the armature doesn't match the spec's skeleton
+    """
+    if spec.get("version") != SPEC_VERSION:
+        raise ValueError(f"Unsupported rig-spec version: {spec.get('version')}")
+
+    names = spec["bones"]
+    base = spec["base"]
+
+    missing = [name for name in names[:base] if name not in obj.data.bones]
+    if missing:
+        raise ValueError(
+            f"{obj.name} does not match the rig-spec, missing bones: {', '.join(missing[:5])}")
+
+    with preserved_selection():
+        make_single_active(obj)
+        bpy.ops.object.mode_set(mode="EDIT")
+        edit_bones = obj.data.edit_bones
+
+        for i, name in enumerate(names[base:]):
+            # already there, e.g. converted by hand
+            if name in edit_bones:
+                continue
+
+            bone = edit_bones.new(name)
+            bone[__IS_ADDED_BONE__] = True
+            # NOTE: a zero-length bone gets deleted, the real values come below
+            bone.tail = (0, 0, 1)
+
+            matrix = mathutils.Matrix(
+                [spec["added_matrix"][i * 16 + row * 4:i * 16 + row * 4 + 4]
+                 for row in range(4)])
+            length = spec["added_length"][i]
+
+            parent = spec["added_parent"][i]
+            if parent >= 0:
+                parent = edit_bones[names[parent]]
+                matrix.translation *= parent.length
+                length *= parent.length
+                matrix = parent.matrix @ matrix
+                bone.parent = parent
+
+            bone.matrix = matrix
+            bone.length = length
+
+        # same as `snap_parent_tail_to_child_head`
+        for i in spec["connect"]:
+            child = edit_bones[names[i]]
+            if child.parent:
+                child.parent.tail = child.head
+                child.use_connect = True
+
+        bpy.ops.object.mode_set(mode="OBJECT")
+
+        pose_bones = obj.pose.bones
+        rigify_type = spec["rigify_type"]
+        for i, value in zip(rigify_type["index"], rigify_type["value"]):
+            pose_bones[names[i]].rigify_type = value
+
+        for tag in spec["tags"]:
+            obj[tag] = True
+
+
+def _open(filepath: str, mode: str):
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, mode + "t", encoding="utf-8")
+    return open(filepath, mode, encoding="utf-8")
+
+
+def save(spec: dict, filepath: str):
+    with _open(filepath, "w") as f:
+        # no whitespace, the arrays make up most of the file
+        json.dump(spec, f, separators=(",", ":"))
+
+
+def load(filepath: str) -> dict:
+    with _open(filepath, "r") as f:
+        return json.load(f)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Converts a batch of FBX files through warm, persistent Blender workers.
+
+Runs with a plain Python (no `bpy` needed), e.g.:
+    ./scripts/batch_convert.py --blender /Applications/Blender.app/Contents/MacOS/Blender \
+        --out-dir ./out path/to/*.fbx
+
+Pass `--format fbx` or `--format glb` to get deform-only skeletons for game engines
+instead of .blend files, and `--spec leg.json` to replay a rig-spec saved from a
+reference character onto every file before generating.
+
+The worker is relaunched whenever it recycles itself (see `batch/worker.py`) or crashes.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# keep in sync with `batch/worker.py`
+RESULT_PREFIX = "FBX2RIGIFY_RESULT "
+RECYCLE_EXIT_CODE = 75
+
+WORKER_EXPR = "from FBX2Rigify.batch import worker; worker.main()"
+
+
+def launch_worker(blender, max_rss_mb):
+    return subprocess.Popen(
+        [blender, "-b", "--addons", "rigify,FBX2Rigify",
+         # NOTE: without it, Blender exits with 0 on errors
+         "--python-exit-code", "1",
+         "--python-expr", WORKER_EXPR, "--", "--max-rss-mb", str(max_rss_mb)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+
+def read_result(proc):
+    """Skips Blender's own output until the next result line, None if the worker died"""
+    for line in proc.stdout:
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return None
+
+
+def stop_worker(proc):
+    if proc.stdin:
+        proc.stdin.close()
+    proc.stdout.read()
+    return proc.wait()
+
+
+def output_paths(inputs, out_dir, ext=".blend"):
+    """
+        Maps each input to an output under `out_dir`, keeping the inputs' folder
+        structure below their common folder so that same-named files don't clash.
+        Raises:
+            ValueError if two inputs would still be written to the same output
+    """
+    inputs = [os.path.abspath(src) for src in inputs]
+    if not inputs:
+        return []
+
+    root = os.path.commonpath([os.path.dirname(src) for src in inputs])
+    outputs = [os.path.join(os.path.abspath(out_dir),
+                            os.path.splitext(os.path.relpath(src, root))[0] + ext)
+               for src in inputs]
+
+    # e.g. the same file passed twice, or "walk.fbx" next to "walk.FBX"
+    seen = {}
+    for src, dst in zip(inputs, outputs):
+        key = os.path.normcase(dst).lower()
+        if key in seen:
+            raise ValueError(f"{seen[key]} and {src} would both be written to {dst}")
+        seen[key] = src
+
+    return outputs
+
+
+def run_batch(jobs, blender, max_rss_mb):
+    """Feeds jobs one at a time to a worker, relaunching it whenever needed"""
+    results = []
+    proc = None
+
+    for job in jobs:
+        if proc is None:
+            proc = launch_worker(blender, max_rss_mb)
+
+        proc.stdin.write(json.dumps(job) + "\n")
+        proc.stdin.flush()
+
+        result = read_result(proc)
+        if result is None:
+            result = {"src": job["src"], "dst": job["dst"], "ok": False,
+                      "error": f"Worker exited with code {proc.wait()}"}
+
+        print(json.dumps(result))
+        results.append(result)
+
+        if result.get("recycle") or proc.poll() is not None:
+            stop_worker(proc)
+            proc = None
+
+    if proc is not None:
+        code = stop_worker(proc)
+        if code not in (0, RECYCLE_EXIT_CODE):
+            print(f"Worker exited with code {code}", file=sys.stderr)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="FBX files to convert")
+    parser.add_argument("--blender", default="blender",
+                        help="path to the Blender executable")
+    parser.add_argument("--out-dir", default="out")
+    parser.add_argument("--format", default="blend",
+                        choices=("blend", "fbx", "glb", "gltf"),
+                        help="output format, all but blend keep only the deform skeleton")
+    parser.add_argument("--spec", help="rig-spec to replay onto every file")
+    parser.add_argument("--max-rss-mb", type=float, default=4096,
+                        help="recycle a worker past this resident memory, 0 to disable")
+    args = parser.parse_args()
+
+    try:
+        outputs = output_paths(args.inputs, args.out_dir, "." + args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    spec = os.path.abspath(args.spec) if args.spec else None
+    jobs = [{"src": os.path.abspath(src), "dst": dst, "spec": spec}
+            for src, dst in zip(args.inputs, outputs)]
+
+    results = run_batch(jobs, args.blender, args.max_rss_mb)
+    failed = [r for r in results if not r["ok"]]
+    print(f"{len(results) - len(failed)}/{len(results)} converted")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
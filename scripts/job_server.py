@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Coordinates FBX conversions across several machines over HTTP.
+
+Runs with a plain Python (no `bpy` needed). Workers are Blender sessions running
+`batch/remote.py`, pulling jobs from here and pushing back results and metrics.
+Paths in jobs must be reachable by every worker, e.g. on a shared drive.
+
+    # all on one machine, with 4 local workers
+    ./scripts/job_server.py --blender blender --local-workers 4 --out-dir ./out path/to/*.fbx
+
+    # render farm: serve the queue, then start `remote.main()` on every node
+    ./scripts/job_server.py --host 0.0.0.0 --out-dir /mnt/share/out /mnt/share/in/*.fbx
+
+Routes (all JSON):
+    POST /claim   {"worker": name}  -> {"job": {...} or null, "done": bool, "lease_seconds": ...}
+    POST /renew   {"id": ..., "worker": name}  -> {"ok": bool}
+    POST /result  {"id": ..., "ok": ..., ...metrics}
+    POST /jobs    {"src": ..., "dst": ..., "spec": ...}  -> {"id": ...}
+                  only with --accept-jobs, and `dst` must be under --out-dir
+    GET  /status
+Unknown job ids get a 404, malformed payloads a 400.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch_convert import RECYCLE_EXIT_CODE, output_paths
+
+REMOTE_EXPR = "from FBX2Rigify.batch import remote; remote.main()"
+# a claimed job comes back to the queue if its worker stops renewing it for that long
+DEFAULT_LEASE_SECONDS = 600
+# a local worker crashing that many times in a row is not relaunched anymore
+MAX_CRASHES = 3
+
+
+class JobQueue:
+    """Thread-safe queue of jobs, with leases so that lost jobs are retried"""
+
+    def __init__(self, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=2,
+                 keep_serving=False, clock=time.monotonic):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # never done, as more jobs may still come on POST /jobs
+        self.keep_serving = keep_serving
+        self.clock = clock
+        self.stopped = False
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.claimed = {}
+        self.results = {}
+        self.jobs = {}
+        self.attempts = {}
+
+    def __contains__(self, job_id):
+        with self.lock:
+            return job_id in self.jobs
+
+    def add(self, src, dst, spec=None):
+        with self.lock:
+            # unique across restarts, so that results from workers still running
+            # jobs of a previous server can't be taken for other jobs
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {"id": job_id, "src": src, "dst": dst, "spec": spec}
+            self.attempts[job_id] = 0
+            self.pending.append(job_id)
+        return job_id
+
+    def _expire_leases(self):
+        now = self.clock()
+        for job_id, (_, deadline) in list(self.claimed.items()):
+            if deadline < now:
+                del self.claimed[job_id]
+                self._retry_or_fail(job_id, "Lease expired")
+
+    def _retry_or_fail(self, job_id, error):
+        if self.attempts[job_id] < self.max_attempts:
+            self.pending.append(job_id)
+        else:
+            self.results[job_id] = dict(self.jobs[job_id], ok=False, error=error)
+
+    def claim(self, worker):
+        with self.lock:
+            self._expire_leases()
+            if self.stopped or not self.pending:
+                return None
+
+            job_id = self.pending.popleft()
+            self.attempts[job_id] += 1
+            self.claimed[job_id] = (worker, self.clock() + self.lease_seconds)
+            return self.jobs[job_id]
+
+    def renew(self, job_id, worker):
+        """
+            Extends the lease of a job still being worked on.
+            Returns:
+                False if the job has been handed out to another worker, or is over
+        """
+        with self.lock:
+            if job_id not in self.jobs:
+                return False
+
+            self._expire_leases()
+            holder = self.claimed.get(job_id)
+
+            if holder is None and job_id in self.pending:
+                # the lease ran out but nobody else took the job yet
+                self.pending.remove(job_id)
+            elif holder is None or holder[0] != worker:
+                return False
+
+            self.claimed[job_id] = (worker, self.clock() + self.lease_seconds)
+            return True
+
+    def complete(self, result):
+        """
+            Records the result of a job.
+            Returns:
+                False if the job is unknown
+        """
+        with self.lock:
+            job_id = result.get("id")
+            if job_id not in self.jobs:
+                return False
+
+            previous = self.results.get(job_id)
+            if previous:
+                # a late success still beats an expired lease or an earlier failure
+                if result.get("ok") and not previous.get("ok"):
+                    self.results[job_id] = result
+                return True
+
+            holder = self.claimed.get(job_id)
+            if holder and holder[0] != result.get("worker") and not result.get("ok"):
+                # stale failure from a worker whose lease expired
+                return True
+
+            self.claimed.pop(job_id, None)
+
+            if result.get("ok"):
+                if job_id in self.pending:
+                    self.pending.remove(job_id)
+                self.results[job_id] = result
+            elif job_id not in self.pending:
+                self._retry_or_fail(job_id, result.get("error"))
+                # keeps the worker's own metrics on the final failure
+                if job_id in self.results:
+                    self.results[job_id] = result
+
+            return True
+
+    def stop(self):
+        """Hands out no more jobs, and lets the workers exit"""
+        with self.lock:
+            self.stopped = True
+
+    def done(self):
+        with self.lock:
+            if self.stopped:
+                return True
+            if self.keep_serving:
+                return False
+
+            self._expire_leases()
+            return len(self.results) == len(self.jobs)
+
+    def status(self):
+        with self.lock:
+            results = list(self.results.values())
+            return {
+                "total": len(self.jobs),
+                "pending": len(self.pending),
+                "claimed": len(self.claimed),
+                "ok": sum(1 for r in results if r.get("ok")),
+                "failed": sum(1 for r in results if not r.get("ok")),
+                "seconds": round(sum(r.get("seconds", 0) for r in results), 3),
+            }
+
+
+def is_under(path, folder):
+    """Tells whether `path` resolves inside `folder`, following links"""
+    path = os.path.realpath(path)
+    folder = os.path.realpath(folder)
+    return os.path.commonpath([path, folder]) == folder
+
+
+class BadRequest(Exception):
+    pass
+
+
+def make_handler(queue, out_dir=None):
+    """
+        Args:
+            out_dir: the folder jobs added on POST /jobs must write into,
+                or None to refuse them
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, payload, code=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                raise BadRequest(f"Invalid JSON: {e}")
+
+            if not isinstance(payload, dict):
+                raise BadRequest("The payload must be a JSON object")
+            return payload
+
+        def _read_job_id(self, payload):
+            job_id = payload.get("id")
+            if not isinstance(job_id, str):
+                raise BadRequest("Missing job id")
+            return job_id
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(queue.status())
+            else:
+                self._reply({"error": "Not found"}, 404)
+
+        def do_POST(self):
+            try:
+                self._post(self._read())
+            except BadRequest as e:
+                self._reply({"error": str(e)}, 400)
+
+        def _post(self, payload):
+            if self.path == "/claim":
+                job = queue.claim(payload.get("worker"))
+                self._reply({"job": job, "done": job is None and queue.done(),
+                             "lease_seconds": queue.lease_seconds})
+            elif self.path == "/renew":
+                job_id = self._read_job_id(payload)
+                if job_id not in queue:
+                    self._reply({"error": f"Unknown job {job_id}"}, 404)
+                    return
+                self._reply({"ok": queue.renew(job_id, payload.get("worker"))})
+            elif self.path == "/result":
+                job_id = self._read_job_id(payload)
+                if not queue.complete(payload):
+                    self._reply({"error": f"Unknown job {job_id}"}, 404)
+                    return
+                print(json.dumps(payload))
+                self._reply({})
+            elif self.path == "/jobs":
+                self._add_job(payload)
+            else:
+                self._reply({"error": "Not found"}, 404)
+
+        def _add_job(self, payload):
+            if out_dir is None:
+                self._reply({"error": "Adding jobs is disabled, see --accept-jobs"}, 403)
+                return
+
+            src, dst, spec = payload.get("src"), payload.get("dst"), payload.get("spec")
+            if not isinstance(src, str) or not isinstance(dst, str):
+                raise BadRequest("Jobs need a src and a dst path")
+            if spec is not None and not isinstance(spec, str):
+                raise BadRequest("The spec must be a path")
+
+            # workers overwrite `dst` on every node, it must not go anywhere else
+            if not is_under(dst, out_dir):
+                self._reply({"error": f"dst must be under {out_dir}"}, 403)
+                return
+
+            self._reply({"id": queue.add(src, os.path.realpath(dst), spec)})
+
+        def log_message(self, format, *args):
+            # one line per result is printed already
+            pass
+
+    return Handler
+
+
+def supervise_local_worker(blender, server, index, max_rss_mb, queue):
+    """Runs one local worker, relaunching it until the queue is done"""
+    crashes = 0
+    while not queue.done():
+        try:
+            # NOTE: without `--python-exit-code`, Blender exits with 0 on errors
+            code = subprocess.call(
+                [blender, "-b", "--addons", "rigify,FBX2Rigify",
+                 "--python-exit-code", "1",
+                 "--python-expr", REMOTE_EXPR, "--",
+                 "--server", server, "--name", f"local-{index}",
+                 "--max-rss-mb", str(max_rss_mb)],
+                stdout=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Could not launch worker local-{index}: {e}", file=sys.stderr)
+            return
+
+        if code in (0, RECYCLE_EXIT_CODE):
+            crashes = 0
+            continue
+
+        crashes += 1
+        if crashes >= MAX_CRASHES:
+            print(f"Worker local-{index} crashed {crashes} times in a row, giving up",
+                  file=sys.stderr)
+            return
+
+        print(f"Worker local-{index} exited with code {code}, relaunching",
+              file=sys.stderr)
+        time.sleep(crashes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="*", help="FBX files to convert")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out-dir", default="out")
+    parser.add_argument("--format", default="blend",
+                        choices=("blend", "fbx", "glb", "gltf"),
+                        help="output format, all but blend keep only the deform skeleton")
+    parser.add_argument("--spec", help="rig-spec to replay onto every file")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="number of Blender workers to start on this machine")
+    parser.add_argument("--blender", default="blender",
+                        help="path to the Blender executable, for local workers")
+    parser.add_argument("--max-rss-mb", type=float, default=4096,
+                        help="recycle a local worker past this resident memory, 0 to disable")
+    parser.add_argument("--accept-jobs", action="store_true",
+                        help="accept jobs writing under --out-dir on POST /jobs")
+    parser.add_argument("--keep-serving", action="store_true",
+                        help="keep serving once the queue is drained, for jobs added on POST /jobs")
+    args = parser.parse_args()
+
+    try:
+        outputs = output_paths(args.inputs, args.out_dir, "." + args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    queue = JobQueue(lease_seconds=args.lease_seconds, keep_serving=args.keep_serving)
+    spec = os.path.abspath(args.spec) if args.spec else None
+    for src, dst in zip(args.inputs, outputs):
+        queue.add(os.path.abspath(src), dst, spec)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(queue, os.path.abspath(args.out_dir) if args.accept_jobs else None))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://{args.host}:{args.port}"
+    print(f"Serving {len(args.inputs)} jobs on {url}")
+
+    workers = [
+        threading.Thread(target=supervise_local_worker,
+                         args=(args.blender, url, i, args.max_rss_mb, queue))
+        for i in range(args.local_workers)
+    ]
+    for thread in workers:
+        thread.start()
+
+    try:
+        while not queue.done():
+            if workers and not any(thread.is_alive() for thread in workers):
+                print("All local workers gave up", file=sys.stderr)
+                break
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+
+    # lets the remaining workers exit
+    queue.stop()
+    for thread in workers:
+        thread.join()
+    server.shutdown()
+
+    status = queue.status()
+    print(json.dumps(status))
+    finished = status["ok"] + status["failed"] == status["total"]
+    return 0 if finished and not status["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
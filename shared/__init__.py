@@ -1,7 +1,81 @@
 import logging
+from contextlib import contextmanager
+
 import bpy
 
 
+# ------------------------------------------------------------------------
+#    OBJECT MODE
+# ------------------------------------------------------------------------
+
+def make_single_active(obj):
+    """Make the given object the only selected and active one, in OBJECT mode"""
+    if bpy.context.object and bpy.context.object.mode != "OBJECT":
+        bpy.ops.object.mode_set(mode="OBJECT")
+
+    for other in bpy.context.selected_objects:
+        other.select_set(False)
+
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+
+
+def scale_location_keys(obj, factor: float):
+    """Scale the location keys of the object's action, handles included"""
+    if abs(factor - 1) < 1e-6 or not (obj.animation_data and obj.animation_data.action):
+        return
+
+    for fcurve in obj.animation_data.action.fcurves:
+        if not fcurve.data_path.endswith(".location"):
+            continue
+
+        points = fcurve.keyframe_points
+        for attr in ("co", "handle_left", "handle_right"):
+            values = [0.0] * (len(points) * 2)
+            points.foreach_get(attr, values)
+            # only the values, every other item being the frame
+            values[1::2] = [v * factor for v in values[1::2]]
+            points.foreach_set(attr, values)
+
+        fcurve.update()
+
+
+def apply_transforms(obj):
+    """
+        Apply all transforms of the given object, which must be the active one,
+        keeping its bones' location keys in the same units.
+    """
+    # e.g. 0.01 for FBX in centimeters
+    scale = sum(obj.matrix_world.to_scale()) / 3
+    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
+    # the bones' location keys are still in the unscaled units
+    scale_location_keys(obj, scale)
+
+
+@contextmanager
+def preserved_selection():
+    """Restore the selection, the active object and its mode on exit"""
+    view_layer = bpy.context.view_layer
+    active = view_layer.objects.active
+    mode = active.mode if active else "OBJECT"
+    selected = list(bpy.context.selected_objects)
+
+    try:
+        yield
+    finally:
+        if bpy.context.object and bpy.context.object.mode != "OBJECT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+
+        for obj in bpy.context.selected_objects:
+            obj.select_set(False)
+        for obj in selected:
+            obj.select_set(True)
+
+        view_layer.objects.active = active
+        if active and mode != "OBJECT":
+            bpy.ops.object.mode_set(mode=mode)
+
+
 # ------------------------------------------------------------------------
 #    EDIT MODE
 # ------------------------------------------------------------------------
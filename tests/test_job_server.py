@@ -0,0 +1,284 @@
+"""
+Tests for the job server, which runs without Blender.
+
+Run with `python -m pytest tests` from the repo root, see `pytest.ini`.
+"""
+
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from job_server import JobQueue, make_handler  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_queue(jobs=1, **kwargs):
+    clock = FakeClock()
+    queue = JobQueue(lease_seconds=10, clock=clock, **kwargs)
+    ids = [queue.add(f"{i}.fbx", f"{i}.blend") for i in range(jobs)]
+    return queue, clock, ids
+
+
+def test_job_ids_are_unique():
+    _, _, ids = make_queue(jobs=2)
+    _, _, other_ids = make_queue(jobs=2)
+    assert len(set(ids + other_ids)) == 4
+
+
+def test_claim_hands_out_each_job_once():
+    queue, _, ids = make_queue(jobs=2)
+
+    first = queue.claim("a")
+    second = queue.claim("b")
+
+    assert {first["id"], second["id"]} == set(ids)
+    assert queue.claim("c") is None
+    assert not queue.done()
+
+
+def test_success_finishes_the_queue():
+    queue, _, _ = make_queue()
+    job = queue.claim("a")
+
+    assert queue.complete(dict(job, ok=True, worker="a"))
+
+    assert queue.done()
+    assert queue.status()["ok"] == 1
+
+
+def test_unknown_results_are_rejected():
+    queue, _, _ = make_queue(jobs=2)
+    job = queue.claim("a")
+    queue.complete(dict(job, ok=True, worker="a"))
+
+    assert not queue.complete({"id": "unknown", "ok": True})
+    assert not queue.complete({"id": "unknown", "ok": False, "error": "boom"})
+    assert not queue.complete({"ok": True})
+
+    assert not queue.done()
+    assert queue.status()["ok"] == 1
+
+
+def test_empty_queue_is_done():
+    queue, _, _ = make_queue(jobs=0)
+    assert queue.done()
+
+
+def test_empty_queue_keeps_serving():
+    queue, _, _ = make_queue(jobs=0, keep_serving=True)
+    assert not queue.done()
+
+    queue.add("late.fbx", "late.blend")
+    assert queue.claim("a")["src"] == "late.fbx"
+
+    queue.stop()
+    assert queue.done()
+
+
+def test_failure_is_retried_then_final():
+    queue, _, [job_id] = make_queue()
+
+    job = queue.claim("a")
+    queue.complete(dict(job, ok=False, worker="a", error="boom"))
+    assert not queue.done()
+
+    job = queue.claim("b")
+    queue.complete(dict(job, ok=False, worker="b", error="boom again"))
+
+    assert queue.done()
+    assert queue.status()["failed"] == 1
+    assert queue.results[job_id]["error"] == "boom again"
+
+
+def test_expired_lease_is_handed_out_again():
+    queue, clock, [job_id] = make_queue()
+    queue.claim("a")
+
+    clock.now = 11
+    assert queue.claim("b")["id"] == job_id
+
+
+def test_renewed_lease_does_not_expire():
+    queue, clock, [job_id] = make_queue()
+    queue.claim("a")
+
+    for _ in range(5):
+        clock.now += 8
+        assert queue.renew(job_id, "a")
+
+    assert queue.claim("b") is None
+
+
+def test_renew_fails_once_another_worker_holds_the_job():
+    queue, clock, [job_id] = make_queue()
+    queue.claim("a")
+
+    clock.now = 11
+    queue.claim("b")
+
+    assert not queue.renew(job_id, "a")
+    assert queue.renew(job_id, "b")
+
+
+def test_renew_reclaims_an_expired_job_nobody_took():
+    queue, clock, [job_id] = make_queue()
+    queue.claim("a")
+
+    clock.now = 11
+    assert queue.renew(job_id, "a")
+    assert queue.claim("b") is None
+
+
+def test_renew_unknown_job():
+    queue, _, _ = make_queue()
+    assert not queue.renew("unknown", "a")
+
+
+def test_late_success_replaces_lease_expired():
+    queue, clock, [job_id] = make_queue(max_attempts=1)
+    job = queue.claim("a")
+
+    clock.now = 11
+    assert queue.done()
+    assert queue.results[job_id]["error"] == "Lease expired"
+
+    queue.complete(dict(job, ok=True, worker="a"))
+    assert queue.results[job_id]["ok"]
+
+
+def test_stale_failure_is_ignored():
+    queue, clock, [job_id] = make_queue()
+    job = queue.claim("a")
+
+    clock.now = 11
+    queue.claim("b")
+    queue.complete(dict(job, ok=False, worker="a", error="stale"))
+
+    assert queue.claimed[job_id][0] == "b"
+    assert not queue.done()
+
+    queue.complete(dict(job, ok=True, worker="b"))
+    assert queue.done()
+
+
+# HTTP routes
+########################################################################################################################
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Serves a queue with one job on a free local port, accepting new jobs under `tmp_path`"""
+    queue = JobQueue(lease_seconds=10)
+    queue.add("in.fbx", str(tmp_path / "in.blend"))
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(queue, str(tmp_path)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", queue, tmp_path
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(url, route, payload=None, body=None):
+    """Returns the status code and the JSON reply"""
+    if payload is not None:
+        body = json.dumps(payload).encode("utf-8")
+
+    req = urllib.request.Request(url + route, data=body,
+                                 method="GET" if body is None else "POST")
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_http_claim_renew_result(server):
+    url, queue, _ = server
+
+    code, reply = request(url, "/claim", {"worker": "a"})
+    assert code == 200
+    assert reply["lease_seconds"] == 10
+    job = reply["job"]
+
+    code, reply = request(url, "/renew", {"id": job["id"], "worker": "a"})
+    assert (code, reply) == (200, {"ok": True})
+
+    code, _ = request(url, "/result", dict(job, ok=True, worker="a", seconds=1.5))
+    assert code == 200
+
+    code, reply = request(url, "/claim", {"worker": "a"})
+    assert (code, reply["job"], reply["done"]) == (200, None, True)
+
+    code, status = request(url, "/status")
+    assert code == 200
+    assert (status["ok"], status["seconds"]) == (1, 1.5)
+
+
+def test_http_unknown_ids(server):
+    url, queue, _ = server
+
+    assert request(url, "/result", {"id": "unknown", "ok": True})[0] == 404
+    assert request(url, "/renew", {"id": "unknown", "worker": "a"})[0] == 404
+    assert not queue.done()
+
+
+def test_http_bad_payloads(server):
+    url, _, _ = server
+
+    assert request(url, "/result", body=b"not json")[0] == 400
+    assert request(url, "/result", [1, 2])[0] == 400
+    assert request(url, "/result", {"ok": True})[0] == 400
+    assert request(url, "/renew", {"id": 0})[0] == 400
+    assert request(url, "/jobs", {"src": "a.fbx"})[0] == 400
+    assert request(url, "/nowhere", {})[0] == 404
+    assert request(url, "/nowhere")[0] == 404
+
+
+def test_http_add_job(server):
+    url, queue, out_dir = server
+
+    code, reply = request(url, "/jobs", {"src": "b.fbx", "dst": str(out_dir / "sub" / "b.blend")})
+    assert code == 200
+    assert reply["id"] in queue
+
+
+def test_http_add_job_outside_out_dir(server):
+    url, queue, out_dir = server
+
+    for dst in ("/etc/passwd", str(out_dir / ".." / "escape.blend")):
+        code, _ = request(url, "/jobs", {"src": "b.fbx", "dst": dst})
+        assert code == 403
+
+    assert queue.status()["total"] == 1
+
+
+def test_http_add_job_disabled():
+    queue = JobQueue()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(queue))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    try:
+        url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        code, _ = request(url, "/jobs", {"src": "a.fbx", "dst": "a.blend"})
+        assert code == 403
+    finally:
+        httpd.shutdown()
+        httpd.server_close()